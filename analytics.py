@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import sqlite3
+
+DB_PATH = 'game.db'
+
+# Rows fetched per keyset page; each page is its own short read transaction
+EXPORT_PAGE_SIZE = 1000
+EXPORT_COLUMNS = ('id', 'player_name', 'score', 'difficulty', 'date')
+
+
+def init_analytics_indexes(conn):
+    """Creates the indexes the export and aggregate queries read from."""
+    c = conn.cursor()
+    # Keyset pagination order for exports (and the top-10 query)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_high_scores_score_id ON high_scores (score DESC, id DESC)')
+    # Covering indexes: the aggregates never touch the table itself
+    c.execute('CREATE INDEX IF NOT EXISTS idx_high_scores_difficulty_score ON high_scores (difficulty, score)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_high_scores_date_difficulty ON high_scores (date, difficulty)')
+
+
+def _connect_readonly():
+    # Read-only connection: with WAL enabled in init_db, analytics never blocks score writes
+    conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+
+def iter_high_scores(after_score=None, after_id=None, limit=None, page_size=EXPORT_PAGE_SIZE):
+    """Yields high score rows as dicts, ordered by (score, id) descending, starting after the given cursor."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch = page_size if remaining is None else min(page_size, remaining)
+        conn = _connect_readonly()
+        try:
+            if after_score is None:
+                rows = conn.execute('''SELECT id, player_name, score, difficulty, date FROM high_scores
+                                       ORDER BY score DESC, id DESC LIMIT ?''', (batch,)).fetchall()
+            else:
+                rows = conn.execute('''SELECT id, player_name, score, difficulty, date FROM high_scores
+                                       WHERE (score, id) < (?, ?)
+                                       ORDER BY score DESC, id DESC LIMIT ?''',
+                                    (after_score, after_id, batch)).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            yield dict(zip(EXPORT_COLUMNS, row))
+        if len(rows) < batch:
+            return
+        after_id, after_score = rows[-1][0], rows[-1][2]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        # Flush roughly every few KB instead of yielding tiny chunks per row
+        if buffer.tell() > 8192:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def get_score_distribution():
+    """Returns {difficulty: {score: count}} for all saved scores."""
+    conn = _connect_readonly()
+    rows = conn.execute('''SELECT difficulty, score, COUNT(*) FROM high_scores
+                           GROUP BY difficulty, score ORDER BY difficulty, score''').fetchall()
+    conn.close()
+    distribution = {}
+    for difficulty, score, count in rows:
+        distribution.setdefault(difficulty, {})[score] = count
+    return distribution
+
+
+def get_daily_counts(since=None):
+    """Returns [{'day', 'difficulty', 'count'}] of saved scores per day, optionally from `since` (YYYY-MM-DD)."""
+    conn = _connect_readonly()
+    rows = conn.execute('''SELECT substr(date, 1, 10) AS day, difficulty, COUNT(*) FROM high_scores
+                           WHERE date >= ?
+                           GROUP BY day, difficulty ORDER BY day, difficulty''', (since or '',)).fetchall()
+    conn.close()
+    return [{'day': day, 'difficulty': difficulty, 'count': count} for day, difficulty, count in rows]
@@ -1,5 +1,11 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from wordconnect import get_starting_word, get_ai_word_and_clue, check_word_guess, DIFFICULTY_LEVELS
+from daily_challenge import (init_daily_tables, start_daily_scheduler, daily_date, get_daily_chain,
+                             save_daily_score, get_daily_scores)
+from profiling import install_profiler
+from rate_limit import get_wait_stats, RateLimitTimeout
+from analytics import (init_analytics_indexes, iter_high_scores, stream_ndjson, stream_csv,
+                       get_score_distribution, get_daily_counts)
 import time
 import sqlite3
 from datetime import datetime
@@ -8,12 +14,16 @@ import os
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Use environment variable for secret key
+install_profiler(app)  # No-op unless WORDCONNECT_PROFILE or WORDCONNECT_PROFILE_TOKEN is set
 
 def init_db():
     try:
         conn = sqlite3.connect('game.db')
         c = conn.cursor()
         
+        # WAL lets analytics readers run alongside score writes
+        c.execute('PRAGMA journal_mode=WAL')
+        
         # Create high scores table
         c.execute('''CREATE TABLE IF NOT EXISTS high_scores
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,6 +32,8 @@ def init_db():
                       difficulty TEXT NOT NULL,
                       date TEXT NOT NULL)''')
         
+        init_analytics_indexes(conn)
+        
         conn.commit()
         conn.close()
     except Exception as e:
@@ -48,9 +60,52 @@ def index():
     # Clear the session when returning to home screen
     session.clear()
     high_scores = get_high_scores()
+    daily_scores = get_daily_scores(daily_date())
     return render_template('index.html', 
                          difficulties=DIFFICULTY_LEVELS, 
-                         high_scores=high_scores)
+                         high_scores=high_scores,
+                         daily_scores=daily_scores)
+
+@app.route('/rate_limit_stats')
+def rate_limit_stats():
+    """Report model-call queue wait times per priority."""
+    return jsonify(get_wait_stats())
+
+def _export_rows():
+    """Parse the keyset cursor and limit shared by the export endpoints."""
+    after_score = request.args.get('after_score', type=int)
+    after_id = request.args.get('after_id', type=int)
+    if (after_score is None) != (after_id is None):
+        return None, (jsonify({'error': 'after_score and after_id must be given together'}), 400)
+    limit = request.args.get('limit', type=int)
+    return iter_high_scores(after_score, after_id, limit), None
+
+@app.route('/export/high_scores.ndjson')
+def export_high_scores_ndjson():
+    """Stream high scores as NDJSON, best first. Resume with the last row's score and id."""
+    rows, error = _export_rows()
+    if error:
+        return error
+    return Response(stream_with_context(stream_ndjson(rows)), mimetype='application/x-ndjson')
+
+@app.route('/export/high_scores.csv')
+def export_high_scores_csv():
+    """Stream high scores as CSV, best first. Resume with the last row's score and id."""
+    rows, error = _export_rows()
+    if error:
+        return error
+    return Response(stream_with_context(stream_csv(rows)), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=high_scores.csv'})
+
+@app.route('/analytics/score_distribution')
+def score_distribution():
+    """Count saved scores per difficulty and score."""
+    return jsonify(get_score_distribution())
+
+@app.route('/analytics/daily_counts')
+def daily_counts():
+    """Count saved scores per day and difficulty, optionally since=YYYY-MM-DD."""
+    return jsonify(get_daily_counts(request.args.get('since')))
 
 @app.route('/save_score', methods=['POST'])
 def save_score():
@@ -60,7 +115,11 @@ def save_score():
         score = data.get('score', 0)
         difficulty = data.get('difficulty', 'easy')
         
-        save_high_score(player_name, score, difficulty)
+        # Daily challenge games go to their own leaderboard
+        if session.get('mode') == 'daily':
+            save_daily_score(session['daily_date'], player_name, score, difficulty)
+        else:
+            save_high_score(player_name, score, difficulty)
         return jsonify({'success': True})
     except Exception as e:
         print(f"Error saving score: {str(e)}")
@@ -79,26 +138,41 @@ def start_game():
             return jsonify({'error': 'Invalid difficulty level'}), 400
             
         difficulty_settings = DIFFICULTY_LEVELS[difficulty]
+        mode = request.json.get('mode', 'classic')
         
-        # Get starting word and clue
-        previous_word = get_starting_word()
-        if not previous_word:
-            return jsonify({'error': 'Failed to generate starting word'}), 500
+        if mode == 'daily':
+            # Serve today's precomputed chain without any AI calls
+            challenge_date = daily_date()
+            chain = get_daily_chain(challenge_date, difficulty)
+            if not chain:
+                return jsonify({'error': "Today's daily challenge is not ready yet. Please try again soon."}), 503
+            previous_word = chain['seed_word']
+            word_to_guess = chain['steps'][0]['word']
+            clue = chain['steps'][0]['clue']
+            session['daily_date'] = challenge_date
+            session['chain_index'] = 0
+        else:
+            mode = 'classic'
+            # Get starting word and clue
+            previous_word = get_starting_word()
+            if not previous_word:
+                return jsonify({'error': 'Failed to generate starting word'}), 500
+                
+            word_to_guess, clue = get_ai_word_and_clue(
+                previous_word,
+                difficulty_settings['prompt_modifier'],
+                difficulty_settings['clue_style'],
+                [],  # Empty word history for first word
+                difficulty_settings['min_letters'],
+                difficulty_settings['max_letters'],
+                difficulty_settings['word_relation']
+            )
             
-        word_to_guess, clue = get_ai_word_and_clue(
-            previous_word,
-            difficulty_settings['prompt_modifier'],
-            difficulty_settings['clue_style'],
-            [],  # Empty word history for first word
-            difficulty_settings['min_letters'],
-            difficulty_settings['max_letters'],
-            difficulty_settings['word_relation']
-        )
-        
-        if not word_to_guess or not clue:
-            return jsonify({'error': 'Failed to generate word and clue'}), 500
+            if not word_to_guess or not clue:
+                return jsonify({'error': 'Failed to generate word and clue'}), 500
             
         # Store game state in session with timestamp
+        session['mode'] = mode
         session['current_word'] = word_to_guess
         session['previous_word'] = previous_word
         session['clue'] = clue
@@ -114,9 +188,13 @@ def start_game():
             'clue': clue,
             'previous_word': previous_word,
             'score': 0,
-            'time_limit': difficulty_settings['time_limit']
+            'time_limit': difficulty_settings['time_limit'],
+            'mode': mode
         })
         
+    except RateLimitTimeout as e:
+        print(f"Error in start_game: {str(e)}")
+        return jsonify({'error': 'The AI is busy right now. Please try again in a moment.'}), 503
     except Exception as e:
         print(f"Error in start_game: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -181,17 +259,27 @@ def check_guess():
             score += 1
             session['score'] = score
             
-            # Get next word with proper difficulty settings
             difficulty_settings = DIFFICULTY_LEVELS[difficulty]
-            next_word, next_clue = get_ai_word_and_clue(
-                current_word,
-                difficulty_settings['prompt_modifier'],
-                difficulty_settings['clue_style'],
-                word_history,
-                difficulty_settings['min_letters'],
-                difficulty_settings['max_letters'],
-                difficulty_settings['word_relation']
-            )
+            if session.get('mode') == 'daily':
+                # Next word comes from the stored chain; running off its end is a victory
+                chain = get_daily_chain(session['daily_date'], difficulty)
+                chain_index = session.get('chain_index', 0) + 1
+                session['chain_index'] = chain_index
+                next_word, next_clue = None, None
+                if chain and chain_index < len(chain['steps']):
+                    next_word = chain['steps'][chain_index]['word']
+                    next_clue = chain['steps'][chain_index]['clue']
+            else:
+                # Get next word with proper difficulty settings
+                next_word, next_clue = get_ai_word_and_clue(
+                    current_word,
+                    difficulty_settings['prompt_modifier'],
+                    difficulty_settings['clue_style'],
+                    word_history,
+                    difficulty_settings['min_letters'],
+                    difficulty_settings['max_letters'],
+                    difficulty_settings['word_relation']
+                )
             
             if not next_word or next_word in word_history:
                 session['game_active'] = False
@@ -237,6 +325,14 @@ def check_guess():
             'game_over': True
         })
         
+    except RateLimitTimeout as e:
+        print(f"Error in check_guess: {str(e)}")
+        return jsonify({
+            'error': "The AI is busy right now and couldn't think of the next word. Please start a new game in a moment.",
+            'game_over': True,
+            'score': session.get('score', 0),
+            'word_history': session.get('word_history', [])
+        }), 503
     except Exception as e:
         print(f"Error in check_guess: {str(e)}")
         return jsonify({
@@ -248,6 +344,8 @@ def check_guess():
 
 # Initialize database on startup
 init_db()
+init_daily_tables()
+start_daily_scheduler()
 
 # For Vercel deployment
 app = app
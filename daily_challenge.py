@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from wordconnect import get_starting_word, get_ai_word_and_clue, validate_word, DIFFICULTY_LEVELS
+from rate_limit import model_priority, PRIORITY_BACKGROUND
+
+DB_PATH = 'game.db'
+
+# Number of words players have to guess in a daily chain
+DAILY_CHAIN_LENGTH = int(os.environ.get('DAILY_CHAIN_LENGTH', 20))
+# A chain shorter than this is discarded and generated again
+DAILY_MIN_CHAIN_LENGTH = 5
+# Attempts per difficulty before giving up until the next scheduler run
+DAILY_GENERATION_ATTEMPTS = 3
+# A generation claim older than this is assumed to belong to a dead worker
+DAILY_CLAIM_TIMEOUT_SECONDS = 30 * 60
+
+# Ready chains never change, so each process keeps them after the first read
+_chain_cache = {}
+_chain_cache_lock = threading.Lock()
+
+
+def daily_date():
+    # One chain per UTC day so every player sees the same puzzle
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def init_daily_tables():
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        c = conn.cursor()
+
+        # One row per day and difficulty; chain is NULL until generation finishes
+        c.execute('''CREATE TABLE IF NOT EXISTS daily_chains
+                     (date TEXT NOT NULL,
+                      difficulty TEXT NOT NULL,
+                      seed_word TEXT,
+                      chain TEXT,
+                      claimed_at REAL NOT NULL,
+                      created_at TEXT,
+                      PRIMARY KEY (date, difficulty))''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS daily_scores
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      challenge_date TEXT NOT NULL,
+                      player_name TEXT NOT NULL,
+                      score INTEGER NOT NULL,
+                      difficulty TEXT NOT NULL,
+                      date TEXT NOT NULL)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_daily_scores_date_score
+                     ON daily_scores (challenge_date, score DESC)''')
+
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Daily challenge table initialization error: {e}")
+
+
+def _claim_chain(date, difficulty):
+    """Reserve generation of a chain for this process.
+
+    Returns the claim time, which identifies this claim in later writes, or None if
+    another worker owns the chain.
+    """
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        c = conn.cursor()
+        c.execute('INSERT OR IGNORE INTO daily_chains (date, difficulty, claimed_at) VALUES (?, ?, ?)',
+                  (date, difficulty, now))
+        claimed = c.rowcount == 1
+        if not claimed:
+            # Take over a claim abandoned by a worker that died mid-generation
+            c.execute('''UPDATE daily_chains SET claimed_at = ?
+                         WHERE date = ? AND difficulty = ? AND chain IS NULL AND claimed_at < ?''',
+                      (now, date, difficulty, now - DAILY_CLAIM_TIMEOUT_SECONDS))
+            claimed = c.rowcount == 1
+        conn.commit()
+        return now if claimed else None
+    finally:
+        conn.close()
+
+
+def _refresh_claim(date, difficulty, claimed_at):
+    """Keep a claim alive during a long build. Returns the new claim time, or None if the claim was lost."""
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        c = conn.execute('''UPDATE daily_chains SET claimed_at = ?
+                            WHERE date = ? AND difficulty = ? AND chain IS NULL AND claimed_at = ?''',
+                         (now, date, difficulty, claimed_at))
+        conn.commit()
+        return now if c.rowcount == 1 else None
+    finally:
+        conn.close()
+
+
+def _store_chain(date, difficulty, claimed_at, seed_word, steps):
+    """Save a finished chain if this process still owns the claim. Returns True if it was stored."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        c = conn.execute('''UPDATE daily_chains SET seed_word = ?, chain = ?, created_at = ?
+                            WHERE date = ? AND difficulty = ? AND chain IS NULL AND claimed_at = ?''',
+                         (seed_word, json.dumps(steps), datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                          date, difficulty, claimed_at))
+        conn.commit()
+        return c.rowcount == 1
+    finally:
+        conn.close()
+
+
+def _release_claim(date, difficulty, claimed_at):
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute('DELETE FROM daily_chains WHERE date = ? AND difficulty = ? AND chain IS NULL AND claimed_at = ?',
+                 (date, difficulty, claimed_at))
+    conn.commit()
+    conn.close()
+
+
+def generate_daily_chain(difficulty, length=DAILY_CHAIN_LENGTH, on_step=None):
+    """Build one validated chain for a difficulty. Returns (seed_word, steps) or (None, None).
+
+    on_step is called after every word; returning False abandons the chain.
+    """
+    settings = DIFFICULTY_LEVELS[difficulty]
+    seed_word = get_starting_word()
+    previous_word = seed_word
+    word_history = [seed_word]
+    steps = []
+
+    while len(steps) < length:
+        word, clue = get_ai_word_and_clue(
+            previous_word,
+            settings['prompt_modifier'],
+            settings['clue_style'],
+            word_history,
+            settings['min_letters'],
+            settings['max_letters'],
+            settings['word_relation']
+        )
+        if on_step and on_step() is False:
+            return None, None
+        if not word or not clue:
+            break
+        if not validate_word(word, previous_word, word_history, settings['min_letters'], settings['max_letters']):
+            print(f"Daily chain: rejected '{word}' after '{previous_word}'")
+            break
+        steps.append({'word': word, 'clue': clue})
+        word_history.append(word)
+        previous_word = word
+
+    if len(steps) < DAILY_MIN_CHAIN_LENGTH:
+        print(f"Daily chain for {settings['name']} stopped after {len(steps)} words")
+        return None, None
+    return seed_word, steps
+
+
+def build_daily_chain(date, difficulty):
+    """Generate and store the chain for one day and difficulty unless it exists or is being built."""
+    if get_daily_chain(date, difficulty):
+        return False
+    claim = [_claim_chain(date, difficulty)]
+    if claim[0] is None:
+        return False
+    name = DIFFICULTY_LEVELS[difficulty]['name']
+
+    def keep_claim():
+        # Builds wait behind live traffic on the rate limiter and can outlast the claim timeout
+        claim[0] = _refresh_claim(date, difficulty, claim[0])
+        if claim[0] is None:
+            print(f"Daily chain for {date} ({name}): claim taken over by another worker, abandoning")
+            return False
+        return True
+
+    try:
+        for _ in range(DAILY_GENERATION_ATTEMPTS):
+            seed_word, steps = generate_daily_chain(difficulty, on_step=keep_claim)
+            if steps or claim[0] is None:
+                break
+        if not steps:
+            if claim[0] is not None:
+                _release_claim(date, difficulty, claim[0])
+            return False
+
+        if not _store_chain(date, difficulty, claim[0], seed_word, steps):
+            print(f"Daily chain for {date} ({name}): claim lost before saving, discarding")
+            return False
+        print(f"Daily chain for {date} ({name}) ready with {len(steps)} words")
+        return True
+    except Exception as e:
+        print(f"Error building daily chain: {e}")
+        if claim[0] is not None:
+            _release_claim(date, difficulty, claim[0])
+        return False
+
+
+def ensure_daily_chains(date=None):
+    date = date or daily_date()
+    # Chain builds only use quota that live players leave over
+    with model_priority(PRIORITY_BACKGROUND):
+        for difficulty in DIFFICULTY_LEVELS:
+            build_daily_chain(date, difficulty)
+
+
+def get_daily_chain(date, difficulty):
+    """Return {'seed_word', 'steps'} for a ready chain, or None."""
+    key = (date, difficulty)
+    with _chain_cache_lock:
+        if key in _chain_cache:
+            return _chain_cache[key]
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('SELECT seed_word, chain FROM daily_chains WHERE date = ? AND difficulty = ? AND chain IS NOT NULL',
+              (date, difficulty))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    chain = {'seed_word': row[0], 'steps': json.loads(row[1])}
+    with _chain_cache_lock:
+        # Drop other days so the cache never grows past today's chains
+        for old_key in [k for k in _chain_cache if k[0] != date]:
+            del _chain_cache[old_key]
+        _chain_cache[key] = chain
+    return chain
+
+
+def save_daily_score(challenge_date, player_name, score, difficulty):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('INSERT INTO daily_scores (challenge_date, player_name, score, difficulty, date) VALUES (?, ?, ?, ?, ?)',
+              (challenge_date, player_name, score, difficulty, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    conn.commit()
+    conn.close()
+
+
+def get_daily_scores(challenge_date, limit=10):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''SELECT player_name, score, difficulty, date FROM daily_scores
+                 WHERE challenge_date = ? ORDER BY score DESC LIMIT ?''', (challenge_date, limit))
+    scores = c.fetchall()
+    conn.close()
+    return scores
+
+
+def _scheduler_loop():
+    while True:
+        try:
+            ensure_daily_chains()
+        except Exception as e:
+            print(f"Daily challenge scheduler error: {e}")
+        # Wake shortly after the next UTC midnight, or retry sooner if a chain is missing
+        now = datetime.now(timezone.utc)
+        next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0)
+        missing = any(get_daily_chain(daily_date(), d) is None for d in DIFFICULTY_LEVELS)
+        time.sleep(600 if missing else (next_day - now).total_seconds())
+
+
+def start_daily_scheduler():
+    """Start the background job that builds each day's chains. Set DAILY_SCHEDULER=0 to use cron instead."""
+    if os.environ.get('DAILY_SCHEDULER', '1') == '0':
+        return None
+    thread = threading.Thread(target=_scheduler_loop, name='daily-challenge', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    # Run from cron (with DAILY_SCHEDULER=0 on the web workers) to build today's chains
+    init_daily_tables()
+    ensure_daily_chains()
@@ -0,0 +1,257 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+# Cassette settings, read from the environment:
+#   WORDCONNECT_CASSETTE       path of the cassette file (".gz" suffix => gzip)
+#   WORDCONNECT_CASSETTE_MODE  "record", "replay" (recorded latencies) or "replay-fast" (zero latency)
+#   WORDCONNECT_CASSETTE_LENIENT  "1" to serve the next recording in order when a prompt was never
+#                                 recorded, instead of failing; mismatches are logged and counted
+# When several processes record at once (e.g. Flask workers), put "{pid}" in the path so
+# each writes its own file; otherwise only one process may record to a path.
+CASSETTE_PATH_ENV = 'WORDCONNECT_CASSETTE'
+CASSETTE_MODE_ENV = 'WORDCONNECT_CASSETTE_MODE'
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ('record', 'replay', 'replay-fast')
+CASSETTE_LENIENT_ENV = 'WORDCONNECT_CASSETTE_LENIENT'
+
+
+class CassetteError(LookupError):
+    """Replay diverged from the recording: a prompt was never recorded or the cassette ran out."""
+
+
+def prompt_key(prompt):
+    return hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def _caller_name():
+    # Walk past this module and any generate_content wrappers to the game function that asked
+    frame = sys._getframe(1)
+    while frame and (frame.f_globals.get('__name__') == __name__ or frame.f_code.co_name == 'generate_content'):
+        frame = frame.f_back
+    return frame.f_code.co_name if frame else None
+
+
+class Cassette:
+    """A recorded sequence of model interactions plus the random seed of the run."""
+
+    def __init__(self, path, seed=None, interactions=None, lenient=False):
+        self.path = path
+        self.lenient = lenient
+        self.mismatches = 0
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.interactions = interactions or []
+        self._lock = threading.Lock()
+        self._by_key = defaultdict(deque)
+        self._consumed = set()
+        self._cursor = 0
+        for index, interaction in enumerate(self.interactions):
+            self._by_key[interaction['key']].append(index)
+
+    @classmethod
+    def load(cls, path, lenient=False):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        return cls(path, data['seed'], data['interactions'], lenient)
+
+    def save(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with self._lock:
+            data = {'version': CASSETTE_VERSION, 'seed': self.seed, 'interactions': list(self.interactions)}
+        tmp_path = self.path + '.tmp'
+        with opener(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def add(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def next_for(self, prompt):
+        """Return the next unplayed interaction for this prompt.
+
+        Raises CassetteError when the prompt has no recording left. In lenient mode the
+        next unplayed interaction in recording order is served instead, and counted.
+        """
+        key = prompt_key(prompt)
+        with self._lock:
+            queue = self._by_key.get(key)
+            while queue:
+                index = queue.popleft()
+                if index not in self._consumed:
+                    self._consumed.add(index)
+                    return self.interactions[index]
+            if not self.lenient:
+                raise CassetteError(f"Cassette {self.path} has no recording left for prompt {key}")
+            self.mismatches += 1
+            print(f"[Cassette] No recording for prompt {key}; serving the next one in order "
+                  f"({self.mismatches} mismatches so far)")
+            while self._cursor < len(self.interactions):
+                index = self._cursor
+                self._cursor += 1
+                if index not in self._consumed:
+                    self._consumed.add(index)
+                    return self.interactions[index]
+        raise CassetteError(f"Cassette {self.path} has no recorded response left")
+
+
+class _Feedback:
+    def __init__(self, block_reason):
+        self.block_reason = block_reason
+
+
+class ReplayedResponse:
+    """Mimics the parts of a Gemini response the game reads."""
+
+    def __init__(self, text, block_reason=None):
+        self._text = text
+        self.parts = [text] if text else []
+        self.prompt_feedback = _Feedback(block_reason)
+
+    @property
+    def text(self):
+        if not self.parts:
+            raise ValueError("Response has no text")
+        return self._text
+
+
+class RecordingModel:
+    """Wraps a real model and appends every prompt/response pair to a cassette."""
+
+    def __init__(self, model, cassette):
+        self._model = model
+        self._cassette = cassette
+
+    def generate_content(self, prompt, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self._model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            self._record(prompt, start, error=str(e))
+            raise
+        text = None
+        block_reason = None
+        if response.parts:
+            text = response.text
+        elif response.prompt_feedback.block_reason:
+            block_reason = str(response.prompt_feedback.block_reason)
+        self._record(prompt, start, text=text, block_reason=block_reason)
+        return response
+
+    def _record(self, prompt, start, text=None, block_reason=None, error=None):
+        interaction = {
+            'key': prompt_key(prompt),
+            'source': _caller_name(),
+            'prompt': prompt,
+            'latency': round(time.perf_counter() - start, 4),
+        }
+        if text is not None:
+            interaction['text'] = text
+        if block_reason:
+            interaction['block_reason'] = block_reason
+        if error:
+            interaction['error'] = error
+        self._cassette.add(interaction)
+
+
+class ReplayModel:
+    """Serves recorded responses offline, optionally sleeping for the recorded latency."""
+
+    def __init__(self, cassette, use_latency=True):
+        self._cassette = cassette
+        self._use_latency = use_latency
+
+    def generate_content(self, prompt, **kwargs):
+        interaction = self._cassette.next_for(prompt)
+        if self._use_latency:
+            time.sleep(interaction.get('latency', 0))
+        if 'error' in interaction:
+            raise Exception(interaction['error'])
+        return ReplayedResponse(interaction.get('text'), interaction.get('block_reason'))
+
+
+_active_cassette = None
+_active_mode = None
+
+
+def _claim_record_path(path):
+    """Make sure no other live process is recording to path; released when the cassette is saved."""
+    marker = path + '.recording'
+    while True:
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(marker) as f:
+                    owner = int(f.read().strip() or 0)
+                os.kill(owner, 0)
+            except (OSError, ValueError):
+                # The recorder that left this marker is gone
+                os.remove(marker)
+                continue
+            raise RuntimeError(f"Process {owner} is already recording to {path}; "
+                               f"put {{pid}} in {CASSETTE_PATH_ENV} to record one file per process")
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return marker
+
+
+def _save_and_release(cassette, marker):
+    try:
+        cassette.save()
+    finally:
+        os.remove(marker)
+
+
+def cassette_mode():
+    mode = os.getenv(CASSETTE_MODE_ENV, '').strip().lower()
+    if not mode or not os.getenv(CASSETTE_PATH_ENV):
+        return None
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"{CASSETTE_MODE_ENV} must be one of {', '.join(CASSETTE_MODES)}")
+    return mode
+
+
+def is_replaying():
+    return (cassette_mode() or '').startswith('replay')
+
+
+def get_cassette():
+    """Load (replay) or create (record) the cassette named by the environment, once per process."""
+    global _active_cassette, _active_mode
+    mode = cassette_mode()
+    if mode is None:
+        return None
+    if _active_cassette is None:
+        path = os.getenv(CASSETTE_PATH_ENV)
+        if mode == 'record':
+            path = path.replace('{pid}', str(os.getpid()))
+            marker = _claim_record_path(path)
+            _active_cassette = Cassette(path)
+            atexit.register(_save_and_release, _active_cassette, marker)
+        else:
+            _active_cassette = Cassette.load(path, lenient=os.getenv(CASSETTE_LENIENT_ENV) == '1')
+        # Same seed => same starting words and letter hints => same prompts
+        random.seed(_active_cassette.seed)
+        _active_mode = mode
+    return _active_cassette
+
+
+def wrap_model(model):
+    """Return `model` wrapped for recording or replay, or unchanged when no cassette is configured."""
+    cassette = get_cassette()
+    if cassette is None:
+        return model
+    if _active_mode == 'record':
+        return RecordingModel(model, cassette)
+    return ReplayModel(cassette, use_latency=_active_mode == 'replay')
@@ -0,0 +1,155 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import time
+from collections import defaultdict
+
+from flask import g, request, session
+
+# Profiling settings, read from the environment:
+#   WORDCONNECT_PROFILE              "1" to profile a sample of requests
+#   WORDCONNECT_PROFILE_TOKEN        secret; requests sending it in X-Profile-Token are always profiled
+#   WORDCONNECT_PROFILE_SAMPLE_RATE  fraction of requests to profile when WORDCONNECT_PROFILE=1
+#   WORDCONNECT_PROFILE_ROUTES       comma-separated endpoints to consider
+#   WORDCONNECT_PROFILE_DIR          where .pstats and .collapsed files are written
+#   WORDCONNECT_PROFILE_MAX_FILES    number of profiles kept before the oldest are deleted
+PROFILE_HEADER = 'X-Profile-Token'
+DEFAULT_ROUTES = 'start_game,check_guess'
+
+# Paths with less time than this are left out of the collapsed stacks
+MIN_COLLAPSED_SECONDS = 1e-6
+
+# Sampling uses its own generator so it never shifts the game's (possibly seeded) random stream
+_sampler = random.Random()
+
+
+def _func_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{lineno}({name})"
+    # ';' separates frames in the collapsed format
+    return label.replace(';', ':').replace(' ', '_')
+
+
+def collapse_stats(stats):
+    """Turn a pstats.Stats call graph into collapsed stacks (microseconds of self time per path).
+
+    cProfile only records caller/callee pairs, so time is split along each path in
+    proportion to how much of a callee's cumulative time came from that caller.
+    """
+    raw = stats.stats
+    children = defaultdict(dict)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            children[caller][func] = edge[3]
+
+    stacks = defaultdict(float)
+
+    def walk(func, path, labels, fraction):
+        _, _, tt, ct, _ = raw[func]
+        if ct * fraction < MIN_COLLAPSED_SECONDS:
+            return
+        labels = labels + [_func_label(func)]
+        path = path | {func}
+        if tt > 0:
+            stacks[';'.join(labels)] += tt * fraction
+        for child, edge_ct in children.get(func, {}).items():
+            child_ct = raw[child][3]
+            if child in path or child_ct <= 0:
+                continue
+            walk(child, path, labels, fraction * min(edge_ct / child_ct, 1.0))
+
+    # A function is a root for whatever share of its time no recorded caller accounts for,
+    # e.g. calls made from frames that were already running when profiling started
+    for func, (_, _, _, ct, callers) in raw.items():
+        if ct <= 0:
+            continue
+        attributed = sum(edge[3] for caller, edge in callers.items() if caller != func)
+        if attributed < ct:
+            walk(func, frozenset(), [], (ct - attributed) / ct)
+
+    return {stack: int(seconds * 1e6) for stack, seconds in stacks.items() if seconds * 1e6 >= 1}
+
+
+def _rotate(profile_dir, max_files):
+    profiles = sorted(
+        (entry for entry in os.scandir(profile_dir) if entry.name.endswith('.pstats')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(len(profiles) - max_files, 0)]:
+        base = entry.path[:-len('.pstats')]
+        for path in (entry.path, base + '.collapsed'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _tag(value):
+    # Tags come partly from request data, so keep them filename-safe
+    return ''.join(c for c in str(value) if c.isalnum() or c in '-_')[:32] or 'none'
+
+
+def _write_profile(profiler, profile_dir, max_files, route, difficulty, chain_length):
+    os.makedirs(profile_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    base = os.path.join(
+        profile_dir,
+        f"{stamp}_{_tag(route)}_difficulty-{_tag(difficulty)}_chain-{chain_length}_{os.getpid()}-{_sampler.randrange(16 ** 4):04x}"
+    )
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(base + '.pstats')
+    with open(base + '.collapsed', 'w') as f:
+        for stack, micros in sorted(collapse_stats(stats).items()):
+            f.write(f"{stack} {micros}\n")
+
+    _rotate(profile_dir, max_files)
+
+
+def install_profiler(app):
+    """Register sampled cProfile hooks on the app. Nothing is registered when profiling is not configured."""
+    sampling = os.environ.get('WORDCONNECT_PROFILE') == '1'
+    token = os.environ.get('WORDCONNECT_PROFILE_TOKEN')
+    if not sampling and not token:
+        return False
+
+    sample_rate = float(os.environ.get('WORDCONNECT_PROFILE_SAMPLE_RATE', '0.01')) if sampling else 0.0
+    routes = {r.strip() for r in os.environ.get('WORDCONNECT_PROFILE_ROUTES', DEFAULT_ROUTES).split(',') if r.strip()}
+    profile_dir = os.environ.get('WORDCONNECT_PROFILE_DIR', 'profiles')
+    max_files = int(os.environ.get('WORDCONNECT_PROFILE_MAX_FILES', '200'))
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint not in routes:
+            return
+        forced = token and hmac.compare_digest(request.headers.get(PROFILE_HEADER, ''), token)
+        if not forced and _sampler.random() >= sample_rate:
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this process
+            return
+        g.profiler = profiler
+
+    @app.teardown_request
+    def stop_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        try:
+            # Tag with the state after the request so /start_game reports the new game
+            difficulty = session.get('difficulty') or (request.get_json(silent=True) or {}).get('difficulty', 'none')
+            chain_length = len(session.get('word_history', []))
+            _write_profile(profiler, profile_dir, max_files, request.endpoint, difficulty, chain_length)
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+
+    return True
@@ -0,0 +1,223 @@
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Rate limit settings, read from the environment:
+#   WORDCONNECT_RPM             model calls per minute shared by all processes (unset or 0 disables the limiter)
+#   WORDCONNECT_RATE_BURST      calls that may go out back to back after an idle period
+#   WORDCONNECT_RATE_MAX_WAIT   seconds a live call may queue before RateLimitTimeout (0 waits forever)
+#   WORDCONNECT_RATE_LIMIT_DB   SQLite file holding the shared bucket and wait queue
+# The limiter is opt-in; 15 matches the Gemini 1.5 Flash free tier.
+RATE_LIMIT_RPM = float(os.environ.get('WORDCONNECT_RPM') or 0)
+RATE_LIMIT_BURST = float(os.environ.get('WORDCONNECT_RATE_BURST', 3))
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('WORDCONNECT_RATE_MAX_WAIT', 20))
+RATE_LIMIT_DB = os.environ.get('WORDCONNECT_RATE_LIMIT_DB', 'ratelimit.db')
+
+# Lower numbers are served first
+PRIORITY_LIVE = 0         # a player is waiting on this call
+PRIORITY_BACKGROUND = 10  # prefetch, daily chain builds, simulations
+
+# How often a queued call re-checks the bucket, and when a silent waiter is presumed dead
+POLL_INTERVAL = 0.05
+WAITER_TIMEOUT = 10.0
+# How often a sleeping boostable call checks whether it has been boosted
+BOOST_CHECK_INTERVAL = 0.5
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a live call has queued longer than RATE_LIMIT_MAX_WAIT."""
+
+
+class PriorityBoost:
+    """A priority that can be raised while calls made under it are already queued."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def boost(self, value=PRIORITY_LIVE):
+        self.value = min(self.value, value)
+
+
+def _priority_value(priority):
+    return priority.value if isinstance(priority, PriorityBoost) else priority
+
+
+_priority = contextvars.ContextVar('model_priority', default=PRIORITY_LIVE)
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+@contextmanager
+def model_priority(priority):
+    """Runs model calls made inside the block at the given priority (a number or a PriorityBoost)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def run_with_priority(priority, func, *args, **kwargs):
+    """Calls func at the given priority; handy for executor threads, which don't inherit the caller's."""
+    with model_priority(priority):
+        return func(*args, **kwargs)
+
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    # A forked worker must not reuse its parent's connection
+    if conn is None or _local.pid != os.getpid():
+        # Transactions are managed by hand so the bucket check can hold a write lock
+        conn = sqlite3.connect(RATE_LIMIT_DB, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        _local.conn = conn
+        _local.pid = os.getpid()
+    _init_tables(conn)
+    return conn
+
+
+def _init_tables(conn):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn.execute('''CREATE TABLE IF NOT EXISTS bucket
+                        (id INTEGER PRIMARY KEY CHECK (id = 1),
+                         tokens REAL NOT NULL,
+                         updated REAL NOT NULL)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS waiters
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         priority INTEGER NOT NULL,
+                         heartbeat REAL NOT NULL)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS wait_stats
+                        (priority INTEGER PRIMARY KEY,
+                         grants INTEGER NOT NULL,
+                         total_wait REAL NOT NULL,
+                         max_wait REAL NOT NULL)''')
+        conn.execute('INSERT OR IGNORE INTO bucket (id, tokens, updated) VALUES (1, ?, ?)',
+                     (RATE_LIMIT_BURST, time.time()))
+        _initialized = True
+
+
+def acquire(priority=None):
+    """Blocks until this process may make one model call. Returns the seconds spent queued.
+
+    Live calls give up with RateLimitTimeout after RATE_LIMIT_MAX_WAIT seconds; background
+    calls queue for as long as it takes, and start their clock when they are boosted.
+    """
+    if RATE_LIMIT_RPM <= 0:
+        return 0.0
+    source = _priority.get() if priority is None else priority
+    priority = _priority_value(source)
+    rate = RATE_LIMIT_RPM / 60.0
+    conn = _connect()
+    start = time.monotonic()
+    live_since = None
+
+    waiter_id = conn.execute('INSERT INTO waiters (priority, heartbeat) VALUES (?, ?)',
+                             (priority, time.time())).lastrowid
+    try:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                # Pick up a boost given while this call was queued
+                priority = _priority_value(source)
+                conn.execute('DELETE FROM waiters WHERE heartbeat < ?', (now - WAITER_TIMEOUT,))
+                if conn.execute('UPDATE waiters SET heartbeat = ?, priority = ? WHERE id = ?',
+                                (now, priority, waiter_id)).rowcount == 0:
+                    # Purged while stalled (e.g. a long GC pause); queue again at the back
+                    waiter_id = conn.execute('INSERT INTO waiters (priority, heartbeat) VALUES (?, ?)',
+                                             (priority, now)).lastrowid
+
+                if priority <= PRIORITY_LIVE and live_since is None:
+                    live_since = time.monotonic()
+                if (RATE_LIMIT_MAX_WAIT > 0 and live_since is not None
+                        and time.monotonic() - live_since > RATE_LIMIT_MAX_WAIT):
+                    # Fail fast rather than leave a player's request hanging; finally drops the waiter
+                    raise RateLimitTimeout(f"Gemini rate limit: no call slot within {RATE_LIMIT_MAX_WAIT:g}s")
+
+                tokens, updated = conn.execute('SELECT tokens, updated FROM bucket WHERE id = 1').fetchone()
+                tokens = min(RATE_LIMIT_BURST, tokens + max(now - updated, 0) * rate)
+                head = conn.execute('SELECT id FROM waiters ORDER BY priority, id LIMIT 1').fetchone()[0]
+
+                if head == waiter_id and tokens >= 1:
+                    waited = time.monotonic() - start
+                    conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens - 1, now))
+                    conn.execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+                    conn.execute('''INSERT INTO wait_stats (priority, grants, total_wait, max_wait)
+                                    VALUES (?, 1, ?, ?)
+                                    ON CONFLICT (priority) DO UPDATE SET
+                                        grants = grants + 1,
+                                        total_wait = total_wait + excluded.total_wait,
+                                        max_wait = MAX(max_wait, excluded.max_wait)''',
+                                 (priority, waited, waited))
+                    conn.execute('COMMIT')
+                    waiter_id = None
+                    return waited
+
+                conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens, now))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+            # The head sleeps until its token is due; everyone else polls for their turn.
+            # Either way wake in time to refresh the heartbeat.
+            delay = (1 - tokens) / rate if head == waiter_id else POLL_INTERVAL
+            delay = min(delay, WAITER_TIMEOUT / 2)
+            if live_since is not None and RATE_LIMIT_MAX_WAIT > 0:
+                delay = min(delay, live_since + RATE_LIMIT_MAX_WAIT - time.monotonic() + POLL_INTERVAL)
+            elif isinstance(source, PriorityBoost):
+                delay = min(delay, BOOST_CHECK_INTERVAL)
+            time.sleep(max(delay, 0.001))
+    finally:
+        if waiter_id is not None:
+            conn.execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+
+
+def get_wait_stats():
+    """Returns queue wait times and current queue depth per priority, across all processes."""
+    if RATE_LIMIT_RPM <= 0:
+        return {'enabled': False}
+    conn = _connect()
+    stats = {
+        'enabled': True,
+        'rpm': RATE_LIMIT_RPM,
+        'burst': RATE_LIMIT_BURST,
+        'max_wait': RATE_LIMIT_MAX_WAIT,
+        'priorities': {},
+    }
+    for priority, grants, total_wait, max_wait in conn.execute(
+            'SELECT priority, grants, total_wait, max_wait FROM wait_stats ORDER BY priority'):
+        stats['priorities'][priority] = {
+            'grants': grants,
+            'avg_wait': round(total_wait / grants, 4) if grants else 0.0,
+            'max_wait': round(max_wait, 4),
+            'queued': 0,
+        }
+    for priority, queued in conn.execute('SELECT priority, COUNT(*) FROM waiters GROUP BY priority'):
+        stats['priorities'].setdefault(priority, {'grants': 0, 'avg_wait': 0.0, 'max_wait': 0.0})['queued'] = queued
+    return stats
+
+
+class RateLimitedModel:
+    """Waits for the shared rate limiter before every generate_content call."""
+
+    def __init__(self, model):
+        self._model = model
+
+    def generate_content(self, prompt, **kwargs):
+        acquire()
+        return self._model.generate_content(prompt, **kwargs)
+
+
+def limit_model(model):
+    """Returns model behind the shared rate limiter, or unchanged when the limiter is disabled."""
+    if RATE_LIMIT_RPM <= 0:
+        return model
+    return RateLimitedModel(model)
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from llm_cassette import Cassette, CassetteError, RecordingModel, ReplayModel, CASSETTE_PATH_ENV, CASSETTE_MODE_ENV
+from rate_limit import model_priority, PRIORITY_BACKGROUND
+
+# Headless self-play: an "oracle" player answers every clue correctly, or fails with
+# a given probability, while the word generator runs against a chosen model backend.
+#
+#   python simulate.py --games 2000 --workers 8 --backend offline --fail-rate 0.1
+#
+# Backends:
+#   offline  synthetic model that answers from the built-in word list (no network)
+#   gemini   the live Gemini API (uses quota!); --cassette-dir records one cassette per game
+#   replay   replays the per-game cassettes in --cassette-dir with zero latency
+# A game's cassette holds its seed, so game N replays the prompts it recorded as long as
+# --difficulty, --fail-rate and --max-chain match the recording run.
+BACKENDS = ('offline', 'replay', 'gemini')
+
+# Set per worker process by _init_worker
+_wordconnect = None
+_backend = None
+_base_model = None
+_cassette_dir = None
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+
+
+class SyntheticModel:
+    """Answers word prompts with random words from the game's word list and clue prompts with a template."""
+
+    def __init__(self, words, latency=0.0):
+        self.words = words
+        self.latency = latency
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        if prompt.startswith("Generate a single word"):
+            return _Response(random.choice(self.words))
+        return _Response("Everyone could see the <BLANK> from here")
+
+
+class CountingModel:
+    """Counts model calls so the simulator can report calls per word."""
+
+    def __init__(self, model):
+        self._model = model
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return self._model.generate_content(prompt, **kwargs)
+
+
+def _init_worker(backend, latency, quiet, cassette_dir):
+    global _wordconnect, _backend, _base_model, _cassette_dir
+    if quiet:
+        # The generator reports every rejected attempt; keep worker output off the report
+        sys.stdout = open(os.devnull, 'w')
+    import wordconnect
+    _wordconnect = wordconnect
+    _backend = backend
+    _cassette_dir = cassette_dir
+    if backend == 'offline':
+        _base_model = SyntheticModel(wordconnect.word_list, latency)
+    elif backend == 'gemini':
+        _base_model = wordconnect.model
+
+
+def _game_model(game_id, seed):
+    """Returns the model for one game and its cassette, which is None unless recording or replaying."""
+    if _cassette_dir is None:
+        return _base_model, None
+    path = os.path.join(_cassette_dir, f'game-{game_id}.json')
+    if _backend == 'replay':
+        try:
+            cassette = Cassette.load(path)
+        except FileNotFoundError:
+            raise CassetteError(f"No cassette recorded for game {game_id} ({path})")
+        return ReplayModel(cassette, use_latency=False), cassette
+    cassette = Cassette(path, seed)
+    return RecordingModel(_base_model, cassette), cassette
+
+
+def play_one_game(game_id, difficulty, fail_rate, max_chain, seed):
+    """Plays one game with the oracle player and returns its measurements."""
+    # Simulated games must never crowd out real players on the shared quota
+    with model_priority(PRIORITY_BACKGROUND):
+        return _play_one_game(game_id, difficulty, fail_rate, max_chain, seed)
+
+
+def _play_one_game(game_id, difficulty, fail_rate, max_chain, seed):
+    w = _wordconnect
+    settings = w.DIFFICULTY_LEVELS[difficulty]
+    model, cassette = _game_model(game_id, seed + game_id)
+    # A replayed game takes its seed from the recording so it sends the same prompts
+    game_seed = cassette.seed if cassette else seed + game_id
+    random.seed(game_seed)
+    player = random.Random(f'player-{game_seed}')
+    counter = w.model = CountingModel(model)
+
+    stats_before = w.generation_stats.copy()
+    start = time.perf_counter()
+
+    previous_word = w.get_starting_word()
+    word_history = [previous_word]
+    retries = []
+    end_reason = 'cap'
+
+    while len(retries) < max_chain:
+        attempts_before = w.generation_stats['attempts']
+        word, clue = w.get_ai_word_and_clue(
+            previous_word,
+            settings['prompt_modifier'],
+            settings['clue_style'],
+            word_history,
+            settings['min_letters'],
+            settings['max_letters'],
+            settings['word_relation']
+        )
+        if not word or not clue:
+            end_reason = 'generator'
+            break
+        retries.append(w.generation_stats['attempts'] - attempts_before - 1)
+
+        guess = word if player.random() >= fail_rate else ''
+        if not w.check_word_guess(guess, word):
+            end_reason = 'player'
+            break
+        word_history.append(word)
+        previous_word = word
+
+    seconds = time.perf_counter() - start
+    if cassette and _backend != 'replay':
+        # Written here rather than at exit: pool workers end without running atexit hooks
+        cassette.save()
+
+    stats = w.generation_stats - stats_before
+    return {
+        'words': len(retries),
+        'model_calls': counter.calls,
+        'seconds': seconds,
+        'retries': retries,
+        'stats': dict(stats),
+        'end_reason': end_reason,
+    }
+
+
+def summarize(results, wall_seconds):
+    """Aggregates per-game results into the capacity-planning report."""
+    words = sum(r['words'] for r in results)
+    calls = sum(r['model_calls'] for r in results)
+    stats = Counter()
+    retries = Counter()
+    for r in results:
+        stats.update(r['stats'])
+        retries.update(r['retries'])
+    give_up_lengths = [r['words'] for r in results if r['end_reason'] == 'generator']
+
+    return {
+        'games': len(results),
+        'words': words,
+        'wall_seconds': round(wall_seconds, 3),
+        'words_per_second': round(words / wall_seconds, 2) if wall_seconds else None,
+        'model_calls': calls,
+        'model_calls_per_word': round(calls / words, 3) if words else None,
+        'retry_distribution': {str(k): retries[k] for k in sorted(retries)},
+        'attempts': stats['attempts'],
+        'similarity_reject_rate': round(stats['too_similar'] / stats['attempts'], 4) if stats['attempts'] else None,
+        'reject_counts': {k: stats[k] for k in ('invalid_format', 'bad_length', 'repeated', 'too_similar', 'clue_failed', 'errors')},
+        'end_reasons': dict(Counter(r['end_reason'] for r in results)),
+        'chain_length_at_give_up': {
+            'games': len(give_up_lengths),
+            'mean': round(statistics.mean(give_up_lengths), 2) if give_up_lengths else None,
+            'median': statistics.median(give_up_lengths) if give_up_lengths else None,
+            'max': max(give_up_lengths) if give_up_lengths else None,
+        },
+    }
+
+
+def print_report(report):
+    print(f"Games played:           {report['games']}")
+    print(f"Words generated:        {report['words']} in {report['wall_seconds']}s")
+    print(f"Words per second:       {report['words_per_second']}")
+    print(f"Model calls per word:   {report['model_calls_per_word']}")
+    print(f"Similarity-reject rate: {report['similarity_reject_rate']}")
+    print(f"Rejects by reason:      {report['reject_counts']}")
+    print("Retries before success:")
+    for retries, count in report['retry_distribution'].items():
+        print(f"  {retries}: {count}")
+    print(f"Game endings:           {report['end_reasons']}")
+    give_up = report['chain_length_at_give_up']
+    print(f"Chain length when the generator gave up: mean {give_up['mean']}, "
+          f"median {give_up['median']}, max {give_up['max']} ({give_up['games']} games)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless WordConnect self-play simulator")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--difficulty', default='2', help="key of DIFFICULTY_LEVELS")
+    parser.add_argument('--backend', choices=BACKENDS, default='offline')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="probability the player misses a word")
+    parser.add_argument('--max-chain', type=int, default=100, help="stop a game after this many words")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per call for the offline backend")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cassette-dir', help="record (gemini) or replay (replay) one cassette per game here")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show generator output from the workers")
+    args = parser.parse_args()
+
+    if args.backend == 'replay' and not args.cassette_dir:
+        parser.error("the replay backend needs --cassette-dir")
+    if args.backend == 'offline' and args.cassette_dir:
+        parser.error("--cassette-dir only applies to the gemini and replay backends")
+
+    # Must be set before the workers import wordconnect. Cassettes are handled per game
+    # here, so a process-wide cassette from the environment would only get in the way.
+    os.environ.pop(CASSETTE_PATH_ENV, None)
+    os.environ.pop(CASSETTE_MODE_ENV, None)
+    if args.backend in ('offline', 'replay'):
+        os.environ['WORDCONNECT_OFFLINE'] = '1'
+    if args.backend == 'gemini' and args.cassette_dir:
+        os.makedirs(args.cassette_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.backend, args.latency, not args.verbose, args.cassette_dir)) as pool:
+            game_ids = range(args.games)
+            results = list(pool.map(
+                play_one_game,
+                game_ids,
+                [args.difficulty] * args.games,
+                [args.fail_rate] * args.games,
+                [args.max_chain] * args.games,
+                [args.seed] * args.games,
+                chunksize=max(1, args.games // (args.workers * 4)),
+            ))
+    except CassetteError as e:
+        # Numbers from a replay that left its recording would be meaningless
+        print(f"Replay diverged from the recorded games: {e}", file=sys.stderr)
+        sys.exit(2)
+    report = summarize(results, time.perf_counter() - start)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from mutagen.mp3 import MP3
+except ImportError:  # Durations are optional; checksums and sizes still work
+    MP3 = None
+
+# Downloads the static assets listed in a manifest, in parallel over one pooled session.
+# Partial downloads are kept as "<name>.part" and resumed with Range requests; finished
+# files are verified against the manifest's sha256. Entries without a sha256 can't be
+# verified and are reported; pin them with --update-manifest once the files are trusted.
+# A sync into the manifest's own directory keeps sizes and audio durations up to date so
+# the frontend can preload selectively; syncs elsewhere never touch the manifest.
+#
+#   python sync_assets.py                                 # sync static/sounds
+#   python sync_assets.py --base-url http://localhost:8000/ --dest /tmp/sounds
+#   python sync_assets.py --require-checksums             # fail on unpinned entries
+#   python sync_assets.py --update-manifest               # record checksums of files already on disk
+DEFAULT_MANIFEST = os.path.join('static', 'sounds', 'manifest.json')
+CHUNK_SIZE = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class ChecksumError(Exception):
+    pass
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_duration(path):
+    """Returns the length of an MP3 in seconds, or None if it can't be read."""
+    if MP3 is None or not path.endswith('.mp3'):
+        return None
+    try:
+        return round(MP3(path).info.length, 3)
+    except Exception:
+        return None
+
+
+def make_session(workers, retries):
+    """Builds one session whose connection pool is shared by all download threads."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def download(session, url, path, timeout):
+    """Streams url to path, resuming from path + '.part' when the server honours Range."""
+    part_path = path + '.part'
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416 and offset:
+            # Nothing left to fetch; the checksum decides whether the part is good
+            pass
+        else:
+            response.raise_for_status()
+            # 206 continues the part file; a plain 200 means the server ignored Range
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+
+    return part_path
+
+
+def sync_asset(session, name, entry, dest, base_url, timeout, attempts):
+    """Makes dest/name match its manifest entry. Returns (status, entry)."""
+    path = os.path.join(dest, name)
+    expected = entry.get('sha256')
+
+    if os.path.exists(path) and (expected is None or file_sha256(path) == expected):
+        status = 'ok'
+    else:
+        url = urljoin(base_url.rstrip('/') + '/', name) if base_url else entry['url']
+        for attempt in range(attempts):
+            try:
+                part_path = download(session, url, path, timeout)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                # Keep the part file; the next attempt resumes from where this one stopped
+                if attempt == attempts - 1:
+                    raise
+                continue
+            if expected and file_sha256(part_path) != expected:
+                os.remove(part_path)
+                if attempt == attempts - 1:
+                    raise ChecksumError(f"{name}: checksum mismatch")
+                continue
+            os.replace(part_path, path)
+            break
+        status = 'downloaded'
+
+    return status, describe(path, entry)
+
+
+def describe(path, entry, checksum=False):
+    """Returns entry with size and duration (and sha256 if checksum is set) taken from the file on disk."""
+    entry = dict(entry)
+    if checksum:
+        entry['sha256'] = file_sha256(path)
+    entry['size'] = os.path.getsize(path)
+    duration = audio_duration(path)
+    if duration is not None:
+        entry['duration'] = duration
+    return entry
+
+
+def sync(manifest_path, dest=None, base_url=None, workers=4, retries=3, timeout=30, attempts=3,
+         require_checksums=False):
+    """Syncs every asset in the manifest. Returns the number of failures."""
+    manifest = load_manifest(manifest_path)
+    manifest_dir = os.path.dirname(manifest_path)
+    dest = dest or manifest_dir
+    os.makedirs(dest, exist_ok=True)
+    # Files synced anywhere else (e.g. a test server's copies) must not leak into the manifest
+    in_place = os.path.abspath(dest) == os.path.abspath(manifest_dir)
+    changed = False
+    failures = 0
+
+    unpinned = sorted(name for name, entry in manifest['assets'].items() if not entry.get('sha256'))
+    if unpinned:
+        print(f"{'Error' if require_checksums else 'Warning'}: no sha256 for {', '.join(unpinned)}; "
+              f"these files are not verified (pin them with --update-manifest)")
+        if require_checksums:
+            return len(unpinned)
+
+    session = make_session(workers, retries)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(sync_asset, session, name, entry, dest, base_url, timeout, attempts): name
+            for name, entry in manifest['assets'].items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                status, entry = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Failed {name}: {e}")
+                continue
+            if in_place and entry != manifest['assets'][name]:
+                manifest['assets'][name] = entry
+                changed = True
+            duration = f", {entry['duration']}s" if 'duration' in entry else ''
+            print(f"{status:>10} {name} ({entry['size']} bytes{duration})")
+
+    if changed:
+        save_manifest(manifest, manifest_path)
+    return failures
+
+
+def update_manifest(manifest_path, dest=None):
+    """Re-records checksum, size and duration for every listed asset already on disk."""
+    manifest = load_manifest(manifest_path)
+    dest = dest or os.path.dirname(manifest_path)
+    for name, entry in manifest['assets'].items():
+        path = os.path.join(dest, name)
+        if os.path.exists(path):
+            manifest['assets'][name] = describe(path, entry, checksum=True)
+    save_manifest(manifest, manifest_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and verify WordConnect static assets")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--dest', help="directory for the files (default: the manifest's directory)")
+    parser.add_argument('--base-url', help="fetch every asset as <base-url>/<name> instead of its manifest url")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--retries', type=int, default=3, help="HTTP-level retries per request")
+    parser.add_argument('--timeout', type=float, default=30, help="connect/read timeout in seconds")
+    parser.add_argument('--update-manifest', action='store_true',
+                        help="record checksums, sizes and durations of files already on disk")
+    parser.add_argument('--require-checksums', action='store_true',
+                        help="fail instead of warning when an entry has no sha256")
+    args = parser.parse_args()
+
+    if args.update_manifest:
+        update_manifest(args.manifest, args.dest)
+        return
+    if sync(args.manifest, args.dest, args.base_url, args.workers, args.retries, args.timeout,
+            require_checksums=args.require_checksums):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+import sync_assets
+
+ASSET = bytes(range(256)) * 400
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Serves ASSET for any path, honouring "Range: bytes=N-" like a CDN would."""
+
+    ranges = []
+
+    def do_GET(self):
+        header = self.headers.get('Range')
+        self.ranges.append(header)
+        start = int(header[len('bytes='):].rstrip('-')) if header else 0
+        self.send_response(206 if header else 200)
+        self.send_header('Content-Length', str(len(ASSET) - start))
+        self.end_headers()
+        self.wfile.write(ASSET[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class SyncAssetsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmp, 'dest')
+        os.makedirs(self.dest)
+        RangeHandler.ranges = []
+        self.server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp)
+
+    def write_manifest(self, sha256):
+        path = os.path.join(self.tmp, 'manifest.json')
+        with open(path, 'w') as f:
+            json.dump({'version': 1, 'assets': {'clip.bin': {'url': 'unused', 'sha256': sha256}}}, f)
+        return path
+
+    def test_resumes_partial_download(self):
+        manifest = self.write_manifest(hashlib.sha256(ASSET).hexdigest())
+        with open(os.path.join(self.dest, 'clip.bin.part'), 'wb') as f:
+            f.write(ASSET[:1000])
+
+        failures = sync_assets.sync(manifest, self.dest, self.base_url, workers=1)
+
+        self.assertEqual(failures, 0)
+        self.assertEqual(RangeHandler.ranges, ['bytes=1000-'])
+        with open(os.path.join(self.dest, 'clip.bin'), 'rb') as f:
+            self.assertEqual(f.read(), ASSET)
+
+    def test_rejects_checksum_mismatch(self):
+        manifest = self.write_manifest('0' * 64)
+        with open(manifest) as f:
+            before = f.read()
+
+        failures = sync_assets.sync(manifest, self.dest, self.base_url, workers=1, attempts=2)
+
+        self.assertEqual(failures, 1)
+        self.assertEqual(os.listdir(self.dest), [])
+        # Syncing into another directory never rewrites the manifest
+        with open(manifest) as f:
+            self.assertEqual(f.read(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
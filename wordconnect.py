@@ -1,11 +1,16 @@
 import google.generativeai as genai
 import os
 import time
-import threading
 import sys
-import select # For non-blocking input check (more reliable timer)
+import selectors
+import queue
+import threading
 import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from llm_cassette import wrap_model, is_replaying, CassetteError
+from rate_limit import limit_model, run_with_priority, PriorityBoost, PRIORITY_BACKGROUND, RateLimitTimeout
 
 # Load environment variables
 load_dotenv()
@@ -13,7 +18,9 @@ load_dotenv()
 # --- Configuration ---
 API_KEY = os.getenv('GOOGLE_API_KEY')
 
-if not API_KEY:
+# Offline runs (cassette replay, simulator backends) never reach Gemini, so no key is needed then
+OFFLINE = is_replaying() or os.getenv('WORDCONNECT_OFFLINE') == '1'
+if not API_KEY and not OFFLINE:
     print("Error: GOOGLE_API_KEY not set in environment variables.")
     print("Please set your Google API Key in the .env file.")
     sys.exit(1)
@@ -38,12 +45,21 @@ GENERATION_CONFIG = {
     "max_output_tokens": 100,  # Increased for longer sentences
 }
 
+def create_model():
+    """Creates a Gemini model, wrapped by the cassette layer so record/replay sees every call."""
+    model = wrap_model(genai.GenerativeModel(
+        model_name="gemini-1.5-flash",
+        generation_config=GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS
+    ))
+    # Offline models spend no quota; everything else shares the cross-process rate limiter
+    return model if OFFLINE else limit_model(model)
+
 # Initialize the model
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    generation_config=GENERATION_CONFIG,
-    safety_settings=SAFETY_SETTINGS
-)
+model = create_model()
+
+# Per-process outcome counts for get_ai_word_and_clue, read by the simulator
+generation_stats = Counter()
 
 # Game settings
 TIME_LIMIT_SECONDS = 15  # Time player has to answer
@@ -118,57 +134,128 @@ DIFFICULTY_LEVELS = {
     }
 }
 
-# --- Global Variables ---
-player_input = None
-input_event = threading.Event()  # To signal when input is received
+# Remaining seconds at which interactive players are warned
+COUNTDOWN_ALERTS = (10, 5, 3, 2, 1)
 
 # --- Helper Functions ---
 
-def display_countdown(timeout):
-    """Displays a countdown timer while waiting for input."""
-    start_time = time.time()
-    while time.time() - start_time < timeout and not input_event.is_set():
-        remaining = int(timeout - (time.time() - start_time))
-        print(f"Time remaining: {remaining}s")
-        time.sleep(1)
-
-def get_timed_input(prompt, timeout):
-    """Gets input from the player within a specified time limit."""
-    global player_input, input_event
-    player_input = None
-    input_event.clear()
-
-    # Start input thread
-    input_thread = threading.Thread(target=wait_for_input, args=(prompt,))
-    input_thread.daemon = True
-    input_thread.start()
-
-    # Wait for input or timeout
-    input_event.wait(timeout)
-
-    if player_input is not None:
-        return player_input
-    else:
-        print("\nTime's up!")
+class InputLoop:
+    """Reads stdin lines on a single thread with a selector, so prompts can time out without leaking threads.
+
+    Works with terminals and pipes; stdin redirected from a regular file is read
+    directly since it never blocks. Where select() can't watch stdin (Windows), a
+    single long-lived reader thread feeds a queue instead. Raises EOFError once the
+    input is exhausted.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self.fd = self.stream.fileno()
+        self.interactive = self.stream.isatty()
+        self.buffer = b''
+        self.eof = False
+        self.lines = None
+        self.selector = None
+        if sys.platform == 'win32':
+            self._start_reader()
+            return
+        self.selector = selectors.DefaultSelector()
+        try:
+            self.selector.register(self.fd, selectors.EVENT_READ)
+        except (OSError, ValueError):
+            # Regular files can't be registered (and are always readable)
+            self.selector.close()
+            self.selector = None
+
+    def _start_reader(self):
+        # One reader for the whole session, so timed-out prompts don't strand a thread each
+        self.lines = queue.Queue()
+        reader = threading.Thread(target=self._read_lines, name="stdin-reader", daemon=True)
+        reader.start()
+
+    def _read_lines(self):
+        while True:
+            line = self.stream.readline()
+            self.lines.put(line.encode() if line else None)
+            if not line:
+                return
+
+    def close(self):
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+
+    def _pop_line(self):
+        if b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            return line.decode(errors='replace').rstrip('\r')
+        if self.eof and self.buffer:
+            line, self.buffer = self.buffer, b''
+            return line.decode(errors='replace')
         return None
 
-def wait_for_input(prompt):
-    """Target function for the input thread."""
-    global player_input, input_event
-    try:
-        player_input = input(prompt)
-    except EOFError:
-        player_input = None
-    input_event.set()
+    def _fill(self, timeout):
+        if self.lines is not None:
+            try:
+                chunk = self.lines.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buffer += chunk
+            return
+        if self.selector:
+            try:
+                ready = self.selector.select(timeout)
+            except OSError:
+                # stdin turned out not to be selectable; nothing has been read yet
+                self.close()
+                self._start_reader()
+                return
+            if not ready:
+                return
+        chunk = os.read(self.fd, 4096)
+        if chunk:
+            self.buffer += chunk
+        else:
+            self.eof = True
+
+    def read_line(self, prompt, timeout=None):
+        """Return the next line, or None if `timeout` seconds pass first."""
+        print(prompt, end='', flush=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        alerts = [a for a in COUNTDOWN_ALERTS if timeout is None or a < timeout] if self.interactive else []
+
+        while True:
+            line = self._pop_line()
+            if line is not None:
+                if not self.interactive:
+                    print(line)  # Echo scripted input so batch transcripts read like a session
+                return line
+            if self.eof:
+                raise EOFError
+
+            wait = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print()
+                    return None
+                # Wake up for the next countdown alert as well as for input
+                while alerts and alerts[0] >= remaining:
+                    alerts.pop(0)
+                wait = remaining - alerts[0] if alerts else remaining
+
+            self._fill(wait)
+
+            if deadline is not None and alerts and deadline - time.monotonic() <= alerts[0] and not self.buffer:
+                print(f"\n[{alerts.pop(0)}s left] {prompt.lstrip()}", end='', flush=True)
 
 def ask_gemini(prompt_text, is_clue=False):
     """Sends a prompt to Gemini and returns the text response."""
     try:
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config=GENERATION_CONFIG,
-            safety_settings=SAFETY_SETTINGS
-        )
+        model = create_model()
         response = model.generate_content(prompt_text)
         
         # Handle potential blocks or empty responses
@@ -192,6 +279,8 @@ def ask_gemini(prompt_text, is_clue=False):
             cleaned_response = cleaned_response.split()[0] if cleaned_response else None
             return cleaned_response.lower() if cleaned_response else None
 
+    except (CassetteError, RateLimitTimeout):
+        raise  # A diverged replay stops the run; a full rate-limit queue fails the request
     except Exception as e:
         print(f"\n[AI Error] An error occurred while contacting Gemini: {e}")
         return None
@@ -244,6 +333,8 @@ def get_contextual_clue(word, model, difficulty_settings=None):
             
         return clue
         
+    except (CassetteError, RateLimitTimeout):
+        raise
     except Exception as e:
         print(f"Error generating clue: {e}")
         # Create a more descriptive fallback clue with proper hints
@@ -267,6 +358,7 @@ def get_ai_word_and_clue(previous_word, prompt_modifier, clue_style, word_histor
             break
     
     for attempt in range(max_attempts):
+        generation_stats['attempts'] += 1
         try:
             # Create a more specific prompt for word selection
             prompt = f"""Generate a single word that:
@@ -288,15 +380,18 @@ Return ONLY the word, nothing else."""
             # Basic validation
             if not new_word or not new_word.isalpha():
                 print(f"Attempt {attempt + 1}: Invalid word format")
+                generation_stats['invalid_format'] += 1
                 continue
                 
             if len(new_word) < min_letters or len(new_word) > max_letters:
                 print(f"Attempt {attempt + 1}: Word length outside range")
+                generation_stats['bad_length'] += 1
                 continue
                 
             # Check for direct repetition
             if new_word in word_history or new_word == previous_word:
                 print(f"Attempt {attempt + 1}: Word already used")
+                generation_stats['repeated'] += 1
                 continue
                 
             # Check for similarity with previous words (more lenient)
@@ -316,21 +411,28 @@ Return ONLY the word, nothing else."""
                         break
             if too_similar:
                 print(f"Attempt {attempt + 1}: Word too similar to previous words")
+                generation_stats['too_similar'] += 1
                 continue
             
             # Get the clue using get_contextual_clue with difficulty settings
             clue = get_contextual_clue(new_word, model, difficulty_settings)
             if not clue:
                 print(f"Attempt {attempt + 1}: Failed to generate clue")
+                generation_stats['clue_failed'] += 1
                 continue
                 
+            generation_stats['words'] += 1
             return new_word, clue
             
+        except (CassetteError, RateLimitTimeout):
+            raise  # Another attempt would only queue again
         except Exception as e:
             print(f"Attempt {attempt + 1}: Error - {str(e)}")
+            generation_stats['errors'] += 1
             continue
     
     print("All attempts failed to generate a valid word and clue")
+    generation_stats['exhausted'] += 1
     return None, None
 
 def check_word_guess(guess, correct_word):
@@ -415,8 +517,20 @@ def validate_word(word, previous_word, word_history, min_letters, max_letters):
 
 # --- Main Game Logic ---
 
-def play_game():
+def play_game(input_loop=None):
     """Runs the main game loop."""
+    input_loop = input_loop or InputLoop()
+    # One reusable worker fetches the next word while the player is still thinking
+    prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    try:
+        _run_game(input_loop, prefetcher)
+    except (KeyboardInterrupt, EOFError):
+        print("\n--- Game Over! Input closed. ---")
+    finally:
+        prefetcher.shutdown(wait=False, cancel_futures=True)
+        input_loop.close()
+
+def _run_game(input_loop, prefetcher):
     score = 0
     word_history = set()  # Use a set for fast checking of used words
 
@@ -427,7 +541,7 @@ def play_game():
 
     difficulty_choice = ""
     while difficulty_choice not in DIFFICULTY_LEVELS:
-        difficulty_choice = input("Enter difficulty number (1-3): ").strip()
+        difficulty_choice = input_loop.read_line("Enter difficulty number (1-3): ").strip()
         if difficulty_choice not in DIFFICULTY_LEVELS:
             print("Invalid choice. Please enter 1, 2, or 3.")
 
@@ -447,7 +561,11 @@ def play_game():
     # --- Initial Word ---
     print("\nGetting the first word from the AI...")
     previous_word = get_starting_word()
-    word_to_guess, current_clue = get_ai_word_and_clue(previous_word, difficulty_modifier, clue_style, word_history, min_letters, max_letters, word_relation)
+    try:
+        word_to_guess, current_clue = get_ai_word_and_clue(previous_word, difficulty_modifier, clue_style, word_history, min_letters, max_letters, word_relation)
+    except RateLimitTimeout as e:
+        print(f"The AI is busy right now ({e}). Exiting.")
+        return
 
     if not word_to_guess or not current_clue:
         print("Failed to get starting word from AI. Exiting.")
@@ -460,9 +578,19 @@ def play_game():
     word_history.add(word_to_guess)
 
     # --- Game Loop ---
+    next_turn = None
     while True:
+        # The next word only depends on the current one, so start on it before the guess arrives
+        if next_turn is None:
+            next_priority = PriorityBoost(PRIORITY_BACKGROUND)
+            next_turn = prefetcher.submit(run_with_priority, next_priority, get_ai_word_and_clue, word_to_guess, difficulty_modifier, clue_style, set(word_history), min_letters, max_letters, word_relation)
+
         # Player's Turn
-        player_guess = get_timed_input("\nEnter your guess (or type 'quit'): ", time_limit)
+        try:
+            player_guess = input_loop.read_line("\nEnter your guess (or type 'quit'): ", time_limit)
+        except EOFError:
+            print("\n--- Game Over! Input closed. ---")
+            break
 
         if player_guess is None:
             print(f"\n--- Time's up! The word was: {word_to_guess.upper()} ---")
@@ -484,9 +612,17 @@ def play_game():
             print(f"\nCorrect! Score: {score}")
             
             # Get next word and clue
-            print("\nAI is thinking of the next word...")
+            if not next_turn.done():
+                print("\nAI is thinking of the next word...")
+                # The player is waiting now, so the prefetch jumps the rate-limit queue
+                next_priority.boost()
             previous_word = word_to_guess
-            next_word, next_clue = get_ai_word_and_clue(previous_word, difficulty_modifier, clue_style, word_history, min_letters, max_letters, word_relation)
+            try:
+                next_word, next_clue = next_turn.result()
+            except RateLimitTimeout as e:
+                print(f"\n--- Game Over! The AI is busy right now ({e}). ---")
+                break
+            next_turn = None
             
             if not next_word or not next_clue:
                 print("\n--- Victory! The AI couldn't think of another word! ---")
@@ -505,6 +641,9 @@ def play_game():
             print(f"\n--- Game Over! The word was: {word_to_guess.upper()} ---")
             break
 
+    if next_turn is not None:
+        next_turn.cancel()
+
     # --- End of Game ---
     print("-" * 30)
     print(f"Final Score: {score}")